@@ -19,3 +19,10 @@ class Member(TypedDict):
     dimension: str
     name: str
     unique_name: str
+
+
+class ErrorResult(TypedDict):
+    error: bool
+    url: str
+    status: int
+    body: str
@@ -1,25 +1,44 @@
-from typing import List, TypedDict
+import base64
+from dataclasses import dataclass
+from functools import lru_cache
+from operator import itemgetter
+from typing import List
 from urllib.parse import urlparse
 
-import httpx
+import orjson
 from mcp.server.fastmcp import FastMCP
 
+from epm.data_types import ErrorResult
+from epm.http_client import get_client, http_error, lifespan
+from epm.stdio import run_stdio
+
 # Initialize FastMCP server
-mcp = FastMCP("EPM")
+mcp = FastMCP("EPM", lifespan=lifespan)
+
+_item_name = itemgetter('name')
 
 
-class UserProfile(TypedDict):
+@dataclass(slots=True, frozen=True)
+class UserProfile:
     url: str
     user: str
     pwd: str
 
 
+@lru_cache(maxsize=256)
 def get_base_url(url: str) -> str:
     parsed_url = urlparse(url)
     base_url = f"{parsed_url.scheme}://{parsed_url.hostname}:{parsed_url.port}/HyperionPlanning/rest/v3"
     return base_url
 
 
+@lru_cache(maxsize=64)
+def _basic_auth_header(user: str, pwd: str) -> dict[str, str]:
+    """Build the Basic Authorization header once per credential pair."""
+    token = base64.b64encode(f"{user}:{pwd}".encode()).decode()
+    return {"Authorization": f"Basic {token}"}
+
+
 @mcp.tool()
 async def connect(epm_server_url: str, user: str, pwd: str) -> UserProfile | str:
     """Connect to EPM server URL.
@@ -31,48 +50,44 @@ async def connect(epm_server_url: str, user: str, pwd: str) -> UserProfile | str
     """
     rest_url = get_base_url(epm_server_url)
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            rest_url,
-            auth=(user, pwd)
-        )
-        content_type = response.headers.get("Content-Type", "")
+    client = get_client()
+    response = await client.get(
+        rest_url,
+        headers=_basic_auth_header(user, pwd)
+    )
+    content_type = response.headers.get("Content-Type", "")
 
-        if content_type.startswith("application/json"):
-            return UserProfile(url=rest_url, user=user, pwd=pwd)
-        else:
-            return f"HTTP GET {rest_url} Error: Unexpected Content-Type: {content_type}"
+    # Compare the media type alone, ignoring parameters such as charset
+    if content_type.partition(';')[0].strip() == "application/json":
+        return UserProfile(url=rest_url, user=user, pwd=pwd)
+    else:
+        return f"HTTP GET {rest_url} Error: Unexpected Content-Type: {content_type}"
 
 
 @mcp.tool()
-async def get_applications(profile: UserProfile) -> List[str] | str:
+async def get_applications(profile: UserProfile) -> List[str] | ErrorResult:
     """Returns a list of applications to which the specified user is assigned.
 
     Args:
         profile: connected user profile
     """
-    epm_server_url = profile.get('url', 'epm_server_url')
-    resource_url = f"{get_base_url(epm_server_url)}/applications"
-    user = profile.get('user', 'user')
-    pwd = profile.get('pwd', 'pwd')
-
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            resource_url,
-            auth=(user, pwd)
-        )
-
-        if response.status_code == 200:
-            data = response.json()
-
-            # Extract names from the items
-            application_names = [item['name'] for item in data['items']]
-            return application_names
-        else:
-            return f'''Error: GET {resource_url}
-            HTTP {response.status_code}
-            {response.text}'''
+    resource_url = f"{get_base_url(profile.url)}/applications"
+
+    client = get_client()
+    response = await client.get(
+        resource_url,
+        headers=_basic_auth_header(profile.user, profile.pwd)
+    )
+
+    if response.status_code == 200:
+        data = orjson.loads(response.content)
+
+        # Extract names from the items
+        application_names = list(map(_item_name, data['items']))
+        return application_names
+    else:
+        return http_error(resource_url, response)
 
 if __name__ == "__main__":
     # Initialize and run the server
-    mcp.run(transport='stdio')
+    run_stdio(mcp)
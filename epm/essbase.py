@@ -1,31 +1,117 @@
-from typing import Dict, List
-from urllib.parse import urlparse
+import asyncio
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, Dict, List
+from urllib.parse import quote
 
 import httpx
+import orjson
+from cachetools import TTLCache
 from mcp.server.fastmcp import FastMCP
 
+from epm.http_client import get_client, http_error, lifespan
 from epm.mdx import (
     member_range_MDX_expression as _member_range_MDX_expression,
     set_MDX_expression as _set_MDX_expression,
 )
-from epm.data_types import UserProfile, Application, Database, Member
+from epm.stdio import run_stdio
+from epm.data_types import UserProfile, Application, Database, ErrorResult, Member
 
 # Initialize FastMCP server
-mcp = FastMCP("Essbase")
+mcp = FastMCP("Essbase", lifespan=lifespan)
 
+# Outline member lookups keyed by (base_url, user, app, db, keyword); misses are cached as None
+_outline_cache: TTLCache = TTLCache(maxsize=10_000, ttl=300)
+_MISSING = object()
 
+# Collection responses keyed by (resource_url, user), revalidated with If-None-Match / If-Modified-Since
+_validator_cache: Dict[tuple[str, str], tuple[Dict[str, str], Any]] = {}
+
+# REST resource URL templates, relative to the Session base_url
+_ABOUT_URL = "{base_url}/about"
+_APPLICATIONS_URL = "{base_url}/applications/actions/name/ALL"
+_DATABASES_URL = "{base_url}/applications/{app}/databases"
+_DIMENSIONS_URL = "{base_url}/applications/{app}/databases/{db}/dimensions"
+_OUTLINE_SEARCH_URL = "{base_url}/outline/{app}/{db}?links=none&fields=MEMBERSANDALIASES&limit=5&matchWholeWord=true"
+
+_item_name = itemgetter('name')
+
+# Scheme, host and optional port of an http(s) URL, skipping any user info
+_URL_RE = re.compile(r'^(https?)://(?:[^@/?#]*@)?(\[[^\]]*\]|[^:/?#]+)(?::(\d+))?')
+
+
+@lru_cache(maxsize=256)
 def get_base_url(url: str) -> str:
-    if url and url.startswith("http"):
-        parsed_url = urlparse(url)
-        if parsed_url.port:
-            base_url = f"{parsed_url.scheme}://{parsed_url.hostname}:{parsed_url.port}/essbase/rest/v1"
+    match = _URL_RE.match(url) if url else None
+    if match:
+        scheme, host, port = match.groups()
+        if port:
+            return f"{scheme}://{host.lower()}:{port}/essbase/rest/v1"
         else:
-            base_url = f"{parsed_url.scheme}://{parsed_url.hostname}/essbase/rest/v1"
-        return base_url
+            return f"{scheme}://{host.lower()}/essbase/rest/v1"
     else:
         return 'Essbase URL'
 
 
+@dataclass(slots=True, frozen=True)
+class Session:
+    """Per-connection values shared by every REST call for a profile."""
+    base_url: str
+    auth: tuple[str, str]
+
+
+@lru_cache(maxsize=256)
+def _session_for(url: str, user: str, pwd: str) -> Session:
+    return Session(base_url=get_base_url(url), auth=(user, pwd))
+
+
+def _session(profile: UserProfile) -> Session:
+    return _session_for(profile['url'], profile['user'], profile['pwd'])
+
+
+def _pick_item(items: List[dict], entity_name: str) -> dict:
+    """Pick the item whose uniqueName matches, else whose name matches, else the first one."""
+    name_match = None
+    for item in items:
+        if item.get('uniqueName') == entity_name:
+            return item
+        if name_match is None and item.get('name') == entity_name:
+            name_match = item
+    return name_match or items[0]
+
+
+async def _get_cached_json(resource_url: str, session: Session) -> tuple[httpx.Response, Any]:
+    """GET a JSON resource, reusing the cached body when the server answers 304 Not Modified.
+
+    Returns the response and its parsed body, or None as the body if the request failed.
+    """
+    cache_key = (resource_url, session.auth[0])
+    cached = _validator_cache.get(cache_key)
+
+    client = get_client()
+    response = await client.get(
+        resource_url,
+        auth=session.auth,
+        headers=cached[0] if cached else None
+    )
+    if response.status_code == 304 and cached:
+        return response, cached[1]
+    if response.status_code != 200:
+        return response, None
+
+    data = orjson.loads(response.content)
+    validators = {}
+    if etag := response.headers.get("ETag"):
+        validators["If-None-Match"] = etag
+    if last_modified := response.headers.get("Last-Modified"):
+        validators["If-Modified-Since"] = last_modified
+    if validators:
+        _validator_cache[cache_key] = (validators, data)
+    return response, data
+
+
 @mcp.tool()
 async def connect(profile: UserProfile) -> UserProfile | str:
     """Connect to Essbase server URL.
@@ -35,111 +121,84 @@ async def connect(profile: UserProfile) -> UserProfile | str:
         user: Essbase user name
         pwd: Essbase user password
     """
-    rest_url = f"{get_base_url(profile['url'])}/about"
-    user = profile['user']
-    pwd = profile['pwd']
-
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            rest_url,
-            auth=(user, pwd)
-        )
-        content_type = response.headers.get("Content-Type", "")
-
-        if content_type.startswith("application/json"):
-            return UserProfile(url=rest_url, user=user, pwd=pwd)
-        else:
-            return f"HTTP GET {rest_url} Error: Unexpected Content-Type: {content_type}"
+    session = _session(profile)
+    rest_url = _ABOUT_URL.format(base_url=session.base_url)
+
+    client = get_client()
+    response = await client.get(
+        rest_url,
+        auth=session.auth
+    )
+    content_type = response.headers.get("Content-Type", "")
+
+    # Compare the media type alone, ignoring parameters such as charset
+    if content_type.partition(';')[0].strip() == "application/json":
+        return UserProfile(url=rest_url, user=profile['user'], pwd=profile['pwd'])
+    else:
+        return f"HTTP GET {rest_url} Error: Unexpected Content-Type: {content_type}"
 
 
 @mcp.tool()
-async def list_applications(profile: UserProfile) -> List[str] | str:
+async def list_applications(profile: UserProfile) -> List[str] | ErrorResult:
     """Returns a list of applications to which the specified user is assigned.
 
     Args:
         profile: connected user profile
     """
-    base_url = get_base_url(profile['url'])
-    resource_url = f"{base_url}/applications/actions/name/ALL"
-    user = profile['user']
-    pwd = profile['pwd']
-
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            resource_url,
-            auth=(user, pwd)
-        )
-
-        if response.status_code == 200:
-            data = response.json()
+    session = _session(profile)
+    resource_url = _APPLICATIONS_URL.format(base_url=session.base_url)
 
-            application_names = data
-            return application_names
-        else:
-            return f'''Error: GET {resource_url}
-            HTTP {response.status_code}
-            {response.text}'''
+    response, data = await _get_cached_json(resource_url, session)
+    if data is not None:
+        application_names = data
+        return application_names
+    else:
+        return http_error(resource_url, response)
 
 
 @mcp.tool()
-async def list_databases(app_profile: Application) -> List[str] | str:
+async def list_databases(app_profile: Application) -> List[str] | ErrorResult:
     """List Essbase databases for the input application.
 
     Args:
         app_profile: Application dict with Essbase connection and application name.
     """
-    base_url = get_base_url(app_profile['url'])
+    session = _session(app_profile)
     app = app_profile['app']
-    user = app_profile['user']
-    pwd = app_profile['pwd']
 
-    resource_url = f"{base_url}/applications/{app}/databases"
-
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            resource_url,
-            auth=(user, pwd)
-        )
-        if response.status_code == 200:
-            data = response.json()
+    resource_url = _DATABASES_URL.format(base_url=session.base_url, app=app)
 
-            database_names = [item['name'] for item in data['items']]
-            return database_names
-        else:
-            return f'''Error: GET {resource_url}\nHTTP {response.status_code}\n{response.text}'''
+    response, data = await _get_cached_json(resource_url, session)
+    if data is not None:
+        database_names = list(map(_item_name, data['items']))
+        return database_names
+    else:
+        return http_error(resource_url, response)
 
 
 @mcp.tool()
-async def list_dimensions(db_profile: Database) -> List[str] | str:
+async def list_dimensions(db_profile: Database) -> List[str] | ErrorResult:
     """List Essbase dimensions for the input database.
 
     Args:
         db_profile: Database dict with Essbase connection, application name, and database name.
     """
-    base_url = get_base_url(db_profile['url'])
+    session = _session(db_profile)
     app = db_profile['app']
     db = db_profile['db']
-    user = db_profile['user']
-    pwd = db_profile['pwd']
-
-    resource_url = f"{base_url}/applications/{app}/databases/{db}/dimensions"
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            resource_url,
-            auth=(user, pwd)
-        )
-        if response.status_code == 200:
-            data = response.json()
+    resource_url = _DIMENSIONS_URL.format(base_url=session.base_url, app=app, db=db)
 
-            dimension_names = [item['name'] for item in data.get('items', [])]
-            return dimension_names
-        else:
-            return f'''Error: GET {resource_url}\nHTTP {response.status_code}\n{response.text}'''
+    response, data = await _get_cached_json(resource_url, session)
+    if data is not None:
+        dimension_names = list(map(_item_name, data.get('items', [])))
+        return dimension_names
+    else:
+        return http_error(resource_url, response)
 
 
 @mcp.tool()
-async def search_members(db_profile: Database, entity_names: List[str]) -> Dict[str, Member | None] | str:
+async def search_members(db_profile: Database, entity_names: List[str]) -> Dict[str, Member | None]:
     """Search for members in the specified Essbase database.
 
     Args:
@@ -147,59 +206,79 @@ async def search_members(db_profile: Database, entity_names: List[str]) -> Dict[
         entity_names (List[str]): List of member names to search for.
 
     Returns:
-        Dict[str, Member | None] | str: A dictionary mapping each entity_name to a Member dict (None if not found).
-        Returns a string if the search fails.
+        Dict[str, Member | None]: A dictionary mapping each entity_name to a Member dict
+        (None if not found or if its lookup failed).
     """
-    base_url = get_base_url(db_profile['url'])
+    session = _session(db_profile)
     app = db_profile['app']
     db = db_profile['db']
-    user = db_profile['user']
-    pwd = db_profile['pwd']
 
-    resource_url = f"{base_url}/outline/{app}/{db}?links=none&fields=MEMBERSANDALIASES&limit=5&matchWholeWord=true"
+    # Built once per search; each lookup only appends its keyword
+    resource_url = _OUTLINE_SEARCH_URL.format(base_url=session.base_url, app=app, db=db)
+    client = get_client()
+
+    async def _fetch(entity_name: str) -> Member | None:
+        response = await client.get(
+            f"{resource_url}&keyword={quote(entity_name, safe='')}",
+            auth=session.auth,
+            headers={"Accept": "application/json"}
+        )
+        if response.status_code != 200:
+            # Not cached: let the next search retry
+            raise LookupError(f"HTTP {response.status_code}")
+        data = orjson.loads(response.content)
+        items = data.get('items', [])
+        if len(items) == 0:
+            return None
+
+        item = _pick_item(items, entity_name)
+        member_name = item.get('name', '')
+        return Member(
+            dimension=item.get('dimensionName', member_name),
+            name=member_name,
+            unique_name=item['uniqueName']
+        )
+
+    async def _lookup(entity_name: str) -> Member | None:
+        # Key on the full credential: a hit sends no request, so the server never gets to reject a wrong password
+        cache_key = (session.base_url, session.auth, app, db, entity_name)
+        # Single lookup: a TTL expiry between a membership test and a read would raise KeyError
+        cached = _outline_cache.get(cache_key, _MISSING)
+        if cached is not _MISSING:
+            return cached
+
+        member = await _fetch(entity_name)
+        _outline_cache[cache_key] = member
+        return member
+
+    # Coalesce repeated names, then issue all lookups concurrently over the shared connection pool
+    unique_names = list(dict.fromkeys(entity_names))
+    members = await asyncio.gather(
+        *(_lookup(entity_name) for entity_name in unique_names),
+        return_exceptions=True
+    )
     results: Dict[str, Member | None] = {}
-    for entity_name in entity_names:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{resource_url}&keyword={entity_name}",
-                auth=(user, pwd),
-                headers={"Accept": "application/json"}
-            )
-            if response.status_code != 200:
-                results[entity_name] = None
-                continue
-            data = response.json()
-            items = data.get('items', [])
-            if len(items) == 0:
-                results[entity_name] = None
-                continue
-
-            # Only include results where name or uniqueName matches exactly, or if only one result
-            if len(items) == 1:
-                item = items[0]
-            else:
-                item = next((itm for itm in items if itm.get(
-                    'uniqueName') == entity_name), None)
-                if not item:
-                    item = next((itm for itm in items if itm.get(
-                        'name') == entity_name), None)
-                if not item:
-                    item = items[0]
-
-            member_name = item.get('name', '')
-            member = Member(
-                dimension=item.get('dimensionName', member_name),
-                name=member_name,
-                unique_name=item['uniqueName']
-            )
-            results[entity_name] = member
+    for entity_name, member in zip(unique_names, members):
+        results[entity_name] = None if isinstance(member, BaseException) else member
 
     return results
 
+
+@mcp.tool()
+async def invalidate_outline_cache() -> int:
+    """Clear cached search_members results, e.g. after the outline has changed.
+
+    Returns:
+        int: The number of cached lookups that were discarded.
+    """
+    count = len(_outline_cache)
+    _outline_cache.clear()
+    return count
+
 member_range_MDX_expression = mcp.tool()(_member_range_MDX_expression)
 set_MDX_expression = mcp.tool()(_set_MDX_expression)
 
 
 if __name__ == "__main__":
     # Initialize and run the server
-    mcp.run(transport='stdio')
+    run_stdio(mcp)
@@ -0,0 +1,91 @@
+import asyncio
+import os
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator, Iterable
+
+import httpx
+
+from epm.data_types import ErrorResult
+
+# Shared client so every tool call reuses pooled keep-alive (HTTP/2 multiplexed) connections
+_client: httpx.AsyncClient | None = None
+
+# Sessions currently inside lifespan(), and the startup warm-up started by the first of them
+_active_lifespans = 0
+_warm_task: asyncio.Task | None = None
+
+
+def new_client(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    """Build an AsyncClient with the pooling and cookie settings used by the shared client."""
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=1000, max_keepalive_connections=100),
+        timeout=httpx.Timeout(30.0, connect=5.0),
+        # Every user shares this client, so never store session cookies that would be replayed for the next user
+        cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+        transport=transport
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared AsyncClient, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = new_client()
+    return _client
+
+
+def error_body(response: httpx.Response, limit: int = 2048) -> str:
+    """Decode at most `limit` bytes of an error response body for reporting."""
+    return response.content[:limit].decode('utf-8', errors='replace')
+
+
+def http_error(url: str, response: httpx.Response) -> ErrorResult:
+    """Describe a failed request as a structured tool result."""
+    return ErrorResult(error=True, url=url, status=response.status_code, body=error_body(response))
+
+
+async def close_client() -> None:
+    """Close the shared AsyncClient and release its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def warm_pool(urls: Iterable[str]) -> None:
+    """Open pooled connections to the given URLs ahead of the first tool call."""
+    client = get_client()
+    # Any response, even an error status, leaves a warm connection behind
+    await asyncio.gather(*(client.head(url) for url in urls), return_exceptions=True)
+
+
+@asynccontextmanager
+async def lifespan(server) -> AsyncIterator[None]:
+    """FastMCP lifespan that warms the shared AsyncClient on startup and closes it on shutdown.
+
+    FastMCP enters the lifespan once per session under the SSE and streamable HTTP
+    transports, so only the first active session warms the client and only the last
+    one to exit closes it.
+
+    Set EPM_WARM_URLS to a comma-separated list of server URLs to connect to at startup.
+    """
+    global _active_lifespans, _warm_task
+    _active_lifespans += 1
+    if _active_lifespans == 1:
+        urls = [url.strip() for url in os.environ.get("EPM_WARM_URLS", "").split(",") if url.strip()]
+        # Warm in the background so server initialization is not held up by slow hosts
+        _warm_task = asyncio.create_task(warm_pool(urls)) if urls else None
+    try:
+        yield
+    finally:
+        _active_lifespans -= 1
+        if _active_lifespans == 0:
+            if _warm_task is not None:
+                # Let any in-flight HEAD request unwind before its client is closed
+                _warm_task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await _warm_task
+                _warm_task = None
+            await close_client()
@@ -1,5 +1,5 @@
+from dataclasses import dataclass
 from typing import List, TypedDict
-from pydantic import BaseModel
 
 from epm.data_types import Member
 
@@ -9,7 +9,8 @@ class MemberRange(TypedDict):
     end_member_name: Member
 
 
-class SetFunction(BaseModel):
+@dataclass(slots=True, frozen=True)
+class SetFunction:
     function_name: str
 
 
@@ -40,11 +41,13 @@ def set_MDX_expression(set_: Set) -> str:
     Returns:
         str: An MDX expression string representing the set.
     """
-    if isinstance(set_['members'], MemberRange):
-        return member_range_MDX_expression(set_['members'])
-    elif isinstance(set_['members'], list):
-        return "{" + ", ".join(set_['members']) + "}"
-    elif isinstance(set_['members'], SetFunction):
-        return f"{set_['members'].function_name}()"
+    members = set_['members']
+    if isinstance(members, list):
+        return "{" + ", ".join(members) + "}"
+    elif isinstance(members, SetFunction):
+        return f"{members.function_name}()"
+    # MemberRange is a TypedDict, which cannot be used with isinstance
+    elif isinstance(members, dict) and 'start_member_name' in members:
+        return member_range_MDX_expression(members)
     else:
         raise ValueError("Invalid members type in Set")
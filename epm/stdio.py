@@ -0,0 +1,9 @@
+from importlib.util import find_spec
+
+import anyio
+from mcp.server.fastmcp import FastMCP
+
+
+def run_stdio(mcp: FastMCP) -> None:
+    """Run a FastMCP server over stdio, on uvloop when the optional package is installed."""
+    anyio.run(mcp.run_stdio_async, backend_options={"use_uvloop": find_spec("uvloop") is not None})
@@ -3,7 +3,8 @@ import sys
 import os
 import platform
 from datetime import datetime
-import json
+
+import orjson
 
 from dotenv import load_dotenv
 
@@ -30,7 +31,7 @@ env_info = {
 system_message = f'''
 Use [environment_details] to tailor command-line or system-level responses.
 <environment_details>
-{json.dumps(env_info, indent=2)}
+{orjson.dumps(env_info, option=orjson.OPT_INDENT_2).decode()}
 </environment_details>
 '''
 
@@ -39,13 +40,35 @@ messages = [
     {"role": "user", "content": user_message}
 ]
 
-completion = client.chat.completions.create(
+write = sys.stdout.write
+# Read the raw SSE stream instead of validating every chunk into a pydantic model
+with client.chat.completions.with_streaming_response.create(
     model="genai.openai.gpt-4.1",
     messages=messages,
     stream=True,
-)
-
-for chunk in completion:
-    if hasattr(chunk, 'choices') and chunk.choices and chunk.choices[0].delta.content:
-        print(chunk.choices[0].delta.content, end='')
-print(end='\n\n')
+) as response:
+    event = None
+    for line in response.iter_lines():
+        if line.startswith("event:"):
+            event = line[6:].strip()
+            continue
+        if not line.startswith("data:"):
+            if not line:
+                # A blank line ends the current event
+                event = None
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        payload = orjson.loads(data)
+        # Errors can arrive mid-stream, either as an error event or as an error payload
+        error = payload.get('error') or (payload if event == 'error' else None)
+        if error:
+            message = error.get('message') if isinstance(error, dict) else error
+            sys.exit(f"\nError: {message or data}")
+        choices = payload.get('choices')
+        if choices:
+            content = choices[0].get('delta', {}).get('content')
+            if content:
+                write(content)
+write('\n\n')
@@ -0,0 +1,23 @@
+import httpx
+import pytest
+from epm import http_client
+
+
+@pytest.fixture
+def mock_transport(monkeypatch):
+    """Route the shared AsyncClient through httpx.MockTransport.
+
+    Call the fixture with a handler mapping httpx.Request to httpx.Response;
+    it returns the list of requests the handler received.
+    """
+    def install(handler):
+        requests = []
+
+        def record(request):
+            requests.append(request)
+            return handler(request)
+
+        client = http_client.new_client(transport=httpx.MockTransport(record))
+        monkeypatch.setattr(http_client, "_client", client)
+        return requests
+    return install
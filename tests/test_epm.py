@@ -0,0 +1,33 @@
+import httpx
+import pytest
+from epm.epm import connect, get_applications, UserProfile
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("content_type, accepted", [
+    ("application/json", True),
+    ("application/json; charset=UTF-8", True),
+    ("application/json-seq", False),
+])
+async def test_connect_content_type_match(mock_transport, content_type, accepted):
+    mock_transport(lambda request: httpx.Response(200, headers={"Content-Type": content_type}, content=b"{}"))
+    result = await connect("http://localhost:9000", "admin", "welcome1")
+    if accepted:
+        assert result == UserProfile(
+            url="http://localhost:9000/HyperionPlanning/rest/v3", user="admin", pwd="welcome1")
+    else:
+        assert isinstance(result, str)
+        assert "Unexpected Content-Type" in result
+
+
+@pytest.mark.asyncio
+async def test_get_applications_error(mock_transport):
+    mock_transport(lambda request: httpx.Response(403, text="Forbidden"))
+    profile = UserProfile(url="http://localhost:9000", user="admin", pwd="welcome1")
+    result = await get_applications(profile)
+    assert result == {
+        "error": True,
+        "url": "http://localhost:9000/HyperionPlanning/rest/v3/applications",
+        "status": 403,
+        "body": "Forbidden",
+    }
@@ -1,28 +1,43 @@
+import base64
 import tomllib
+from functools import lru_cache
+from pathlib import Path
+
+import httpx
 import pytest
 import pytest_asyncio
-from unittest.mock import patch, AsyncMock, Mock
-from epm.essbase import connect, list_applications, list_databases, Application, UserProfile
+from epm import http_client
+from epm.essbase import connect, list_applications, list_databases, Application, UserProfile, _outline_cache, _validator_cache
 
 
+@lru_cache(maxsize=1)
 def get_live_test_instance():
-    with open("test/test_config.toml", "rb") as f:
+    with open(Path(__file__).with_name("test_config.toml"), "rb") as f:
         config = tomllib.load(f)
     return dict(config["essbase_test_instance"])
 
 
+@pytest.fixture(scope="session")
+def live_profile():
+    return get_live_test_instance()
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    _outline_cache.clear()
+    _validator_cache.clear()
+
+
 @pytest_asyncio.fixture
 def profile():
     return UserProfile(url="http://localhost", user="admin", pwd="welcome1")
 
 
 @pytest.mark.asyncio
-async def test_connect_success(profile):
-    mock_response = AsyncMock()
-    mock_response.headers = {"Content-Type": "application/json"}
-    # Return value should not matter since it's not parsed
-    with patch("httpx.AsyncClient.get", new=AsyncMock(return_value=mock_response)):
-        result = await connect(profile)
+async def test_connect_success(profile, mock_transport):
+    # Body should not matter since it's not parsed
+    mock_transport(lambda request: httpx.Response(200, json={}))
+    result = await connect(profile)
     # Should be a UserProfile dict
     assert isinstance(result, dict)
     assert result["user"] == "admin"
@@ -31,30 +46,42 @@ async def test_connect_success(profile):
 
 
 @pytest.mark.asyncio
-async def test_connect_content_type_error(profile):
-    mock_response = AsyncMock()
-    mock_response.headers = {"Content-Type": "text/html"}
-    with patch("httpx.AsyncClient.get", new=AsyncMock(return_value=mock_response)):
-        result = await connect(profile)
+async def test_connect_content_type_error(profile, mock_transport):
+    mock_transport(lambda request: httpx.Response(200, html="<html></html>"))
+    result = await connect(profile)
     assert isinstance(result, str)
     assert "Unexpected Content-Type" in result
 
 
 @pytest.mark.asyncio
-async def test_connect_httpx_exception(profile):
-    with patch("httpx.AsyncClient.get", new=AsyncMock(side_effect=Exception("Connection error"))):
-        # Exception isn't caught inside connect, so should propagate
-        with pytest.raises(Exception) as excinfo:
-            await connect(profile)
-        assert "Connection error" in str(excinfo.value)
+@pytest.mark.parametrize("content_type, accepted", [
+    ("application/json", True),
+    ("application/json; charset=UTF-8", True),
+    ("application/json-seq", False),
+])
+async def test_connect_content_type_match(profile, mock_transport, content_type, accepted):
+    mock_transport(lambda request: httpx.Response(200, headers={"Content-Type": content_type}, content=b"{}"))
+    result = await connect(profile)
+    assert isinstance(result, dict) is accepted
 
 
 @pytest.mark.asyncio
-async def test_connect_live_no_mock():
+async def test_connect_httpx_exception(profile, mock_transport):
+    def handler(request):
+        raise httpx.ConnectError("Connection error")
+
+    mock_transport(handler)
+    # Exception isn't caught inside connect, so should propagate
+    with pytest.raises(Exception) as excinfo:
+        await connect(profile)
+    assert "Connection error" in str(excinfo.value)
+
+
+@pytest.mark.asyncio
+async def test_connect_live_no_mock(live_profile):
     """
     Live integration test: tries to connect to a real Essbase instance with actual credentials.
     """
-    live_profile = get_live_test_instance()
     result = await connect(live_profile)
     print(result)
     assert isinstance(
@@ -65,49 +92,59 @@ async def test_connect_live_no_mock():
 
 
 @pytest.mark.asyncio
-async def test_list_applications_success(profile):
-    # Mock the JSON response data
-    mock_json_data = ["DemoApp1", "DemoApp2"]
+async def test_list_applications_success(profile, mock_transport):
+    mock_transport(lambda request: httpx.Response(200, json=["DemoApp1", "DemoApp2"]))
+    result = await list_applications(profile)
 
-    # Create a mock response
-    mock_response = Mock()  # Use Mock, not AsyncMock for the response object
-    mock_response.status_code = 200
-    # json() is sync, not async
-    mock_response.json = Mock(return_value=mock_json_data)
+    assert isinstance(result, list)
+    assert result == ["DemoApp1", "DemoApp2"]
 
-    # Mock the async client
-    mock_client = AsyncMock()
-    mock_client.get = AsyncMock(return_value=mock_response)
 
-    # Patch the AsyncClient context manager
-    with patch("httpx.AsyncClient") as mock_async_client:
-        mock_async_client.return_value.__aenter__.return_value = mock_client
+@pytest.mark.asyncio
+async def test_list_applications_not_modified(profile, mock_transport):
+    def handler(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, headers={"ETag": '"v1"'}, json=["DemoApp1"])
 
-        result = await list_applications(profile)
+    requests = mock_transport(handler)
+    first = await list_applications(profile)
+    second = await list_applications(profile)
 
-    assert isinstance(result, list)
-    assert result == ["DemoApp1", "DemoApp2"]
+    assert first == second == ["DemoApp1"]
+    assert len(requests) == 2
+    assert requests[1].headers["If-None-Match"] == '"v1"'
 
 
 @pytest.mark.asyncio
-async def test_list_applications_error_mock(profile):
-    mock_response = AsyncMock()
-    mock_response.status_code = 403
-    mock_response.text = "Forbidden"
+async def test_list_applications_error_mock(profile, mock_transport):
+    mock_transport(lambda request: httpx.Response(403, text="Forbidden"))
+    result = await list_applications(profile)
+    # Should return a structured error indicating 403
+    assert isinstance(result, dict)
+    assert result["error"] is True
+    assert result["status"] == 403
+    assert result["body"] == "Forbidden"
+    assert result["url"].endswith("/applications/actions/name/ALL")
 
-    with patch("httpx.AsyncClient.get", new=AsyncMock(return_value=mock_response)):
-        result = await list_applications(profile)
-    # Should return an error string indicating 403
-    assert isinstance(result, str)
-    assert "HTTP 403" in result
+
+@pytest.mark.asyncio
+async def test_shared_client_does_not_share_cookies(mock_transport):
+    requests = mock_transport(lambda request: httpx.Response(
+        200, headers={"Set-Cookie": "JSESSIONID=alice-session; Path=/"}, json=["DemoApp1"]))
+
+    await list_applications(UserProfile(url="http://localhost", user="alice", pwd="alice1"))
+    await list_applications(UserProfile(url="http://localhost", user="bob", pwd="bob1"))
+
+    assert len(requests) == 2
+    assert "cookie" not in requests[1].headers
 
 
 @pytest.mark.asyncio
-async def test_list_applications_live_no_mock():
+async def test_list_applications_live_no_mock(live_profile):
     """
     Live integration test: retrieves the list of Essbase applications for the user profile from a real Essbase instance.
     """
-    live_profile = get_live_test_instance()
     result = await list_applications(live_profile)
     print(result)
     assert isinstance(
@@ -115,11 +152,10 @@ async def test_list_applications_live_no_mock():
 
 
 @pytest.mark.asyncio
-async def test_list_databases_live_no_mock():
+async def test_list_databases_live_no_mock(live_profile):
     """
     Live integration test: lists databases for the first application on a real Essbase instance.
     """
-    live_profile = get_live_test_instance()
     app_list = await list_applications(live_profile)
     assert isinstance(
         app_list, list), f"Expected application list, got: {type(app_list)}"
@@ -142,13 +178,12 @@ async def test_list_databases_live_no_mock():
 
 
 @pytest.mark.asyncio
-async def test_list_dimensions_live_no_mock():
+async def test_list_dimensions_live_no_mock(live_profile):
     """
     Live integration test: lists dimensions for the first database of the first application on a real Essbase instance.
     """
     from epm.essbase import list_dimensions, Database
 
-    live_profile = get_live_test_instance()
     app_list = await list_applications(live_profile)
     assert isinstance(
         app_list, list), f"Expected application list, got: {type(app_list)}"
@@ -185,13 +220,12 @@ async def test_list_dimensions_live_no_mock():
 
 
 @pytest.mark.asyncio
-async def test_search_members_live_no_mock():
+async def test_search_members_live_no_mock(live_profile):
     """
     Live integration test: searches for a member in the first database of the first application on a real Essbase instance.
     """
     from epm.essbase import search_members, Database, Member
 
-    live_profile = get_live_test_instance()
     app_list = await list_applications(live_profile)
     assert isinstance(
         app_list, list), f"Expected application list, got: {type(app_list)}"
@@ -229,3 +263,124 @@ async def test_search_members_live_no_mock():
             for k in ("dimension", "name", "unique_name"):
                 assert k in member, f"Key '{k}' missing from returned member for '{entity}': {member}"
                 assert isinstance(member[k], str), f"Value for key '{k}' in member for '{entity}' is not a string: {type(member[k])}"
+
+
+@pytest.mark.asyncio
+async def test_search_members_mock(profile, mock_transport):
+    from epm.essbase import search_members, Database
+
+    def handler(request):
+        keyword = request.url.params["keyword"]
+        if keyword == "Jan":
+            return httpx.Response(200, json={"items": [
+                {"name": "Jan", "uniqueName": "Jan", "dimensionName": "Year"}
+            ]})
+        elif keyword == "Boom":
+            raise httpx.ConnectError("Connection error")
+        else:
+            return httpx.Response(404)
+
+    mock_transport(handler)
+    db_profile = Database(**profile, app="Sample", db="Basic")
+    result = await search_members(db_profile, ["Jan", "Missing", "Boom"])
+
+    assert list(result) == ["Jan", "Missing", "Boom"]
+    assert result["Jan"] == {"dimension": "Year", "name": "Jan", "unique_name": "Jan"}
+    assert result["Missing"] is None
+    assert result["Boom"] is None
+
+
+@pytest.mark.asyncio
+async def test_search_members_cached(profile, mock_transport):
+    from epm.essbase import search_members, invalidate_outline_cache, Database
+
+    requests = mock_transport(lambda request: httpx.Response(200, json={"items": []}))
+    db_profile = Database(**profile, app="Sample", db="Basic")
+    first = await search_members(db_profile, ["Nowhere"])
+    second = await search_members(db_profile, ["Nowhere"])
+    assert await invalidate_outline_cache() == 1
+    await search_members(db_profile, ["Nowhere"])
+
+    assert first == second == {"Nowhere": None}
+    assert len(requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_search_members_cache_requires_password(profile, mock_transport):
+    from epm.essbase import search_members, Database
+
+    def handler(request):
+        # Only the right password authenticates, as it would against a real server
+        if request.headers["Authorization"] != "Basic " + base64.b64encode(b"admin:welcome1").decode():
+            return httpx.Response(401)
+        return httpx.Response(200, json={"items": [
+            {"name": "Sales", "uniqueName": "Sales", "dimensionName": "Measures"}
+        ]})
+
+    requests = mock_transport(handler)
+    good = Database(**profile, app="Sample", db="Basic")
+    bad = Database(**{**profile, "pwd": "wrong"}, app="Sample", db="Basic")
+    assert (await search_members(good, ["Sales"]))["Sales"] is not None
+    assert await search_members(bad, ["Sales"]) == {"Sales": None}
+    assert len(requests) == 2
+
+
+def test_pick_item_prefers_unique_name_then_name():
+    from epm.essbase import _pick_item
+
+    by_name = {"name": "East", "uniqueName": "[Market].[East]"}
+    by_unique = {"name": "East", "uniqueName": "East"}
+    other = {"name": "Eastern", "uniqueName": "Eastern"}
+    assert _pick_item([other, by_name, by_unique], "East") is by_unique
+    assert _pick_item([other, by_name], "East") is by_name
+    assert _pick_item([other], "East") is other
+
+
+@pytest.mark.asyncio
+async def test_search_members_coalesces_duplicates(profile, mock_transport):
+    from epm.essbase import search_members, Database
+
+    requests = mock_transport(lambda request: httpx.Response(200, json={"items": [
+        {"name": "Sales", "uniqueName": "Sales", "dimensionName": "Measures"}
+    ]}))
+    db_profile = Database(**profile, app="Sample", db="Basic")
+    result = await search_members(db_profile, ["Sales", "Sales", "Sales"])
+
+    assert list(result) == ["Sales"]
+    assert len(requests) == 1
+
+
+def test_get_base_url():
+    from epm.essbase import get_base_url
+
+    assert get_base_url("http://localhost") == "http://localhost/essbase/rest/v1"
+    assert get_base_url("https://Essbase.example.com:9001/essbase/rest/v1/about") == \
+        "https://essbase.example.com:9001/essbase/rest/v1"
+    assert get_base_url("") == "Essbase URL"
+    assert get_base_url("ftp://localhost") == "Essbase URL"
+
+
+@pytest.mark.asyncio
+async def test_lifespan_closes_client_after_last_session():
+    async with http_client.lifespan(None):
+        client = http_client.get_client()
+        async with http_client.lifespan(None):
+            assert http_client.get_client() is client
+        # Another session is still active, so the shared client stays open
+        assert not client.is_closed
+    assert client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_lifespan_warms_pool_from_env(monkeypatch, mock_transport):
+    monkeypatch.setenv("EPM_WARM_URLS", "http://a, ,http://b")
+    requests = mock_transport(lambda request: httpx.Response(200))
+    client = http_client.get_client()
+
+    async with http_client.lifespan(None):
+        await http_client._warm_task
+
+    assert sorted((request.method, str(request.url)) for request in requests) == [
+        ("HEAD", "http://a"), ("HEAD", "http://b")
+    ]
+    assert client.is_closed
@@ -0,0 +1,25 @@
+import pytest
+from epm.data_types import Member
+from epm.mdx import MemberRange, Set, SetFunction, set_MDX_expression
+
+
+def test_set_MDX_expression_member_list():
+    assert set_MDX_expression(Set(members=["Jan", "Feb"])) == "{Jan, Feb}"
+
+
+def test_set_MDX_expression_set_function():
+    assert set_MDX_expression(Set(members=SetFunction(function_name="Children"))) == "Children()"
+
+
+def test_set_MDX_expression_member_range():
+    member_range = MemberRange(
+        start_member_name=Member(dimension="Year", name="Jan", unique_name="[Year].[Jan]"),
+        end_member_name=Member(dimension="Year", name="Mar", unique_name="[Year].[Mar]")
+    )
+    result = set_MDX_expression(Set(members=member_range))
+    assert result == "MemberRange([Year].[Jan], [Year].[Mar])"
+
+
+def test_set_MDX_expression_invalid_members():
+    with pytest.raises(ValueError):
+        set_MDX_expression(Set(members="Jan"))